@@ -1,7 +1,22 @@
 import argparse
-from urllib.parse import quote_plus
+import codecs
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import quote_plus, urlsplit
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+try:
+    # 可选依赖：diskcache，检测结果持久化到磁盘，重启程序后仍可复用
+    import diskcache
+except ImportError:
+    diskcache = None
 
 
 DOUYIN_CHECK_URL_TEMPLATE = "https://link.wtturl.cn/?aid=1128&lang=zh&scene=im&jumper_version=1&target={target}"
@@ -14,44 +29,290 @@ DOUYIN_BLOCK_KEYWORDS = [
     "已终止访问该网页",
 ]
 
+# 微博：命中这些关键字视为拦截状态
+WEIBO_BLOCK_KEYWORDS = [
+    "将要访问",
+    "已停止访问",
+]
 
-def check_douyin_jump(target_url: str, timeout: int = 10) -> dict:
-    """使用抖音检测链接检查目标地址是否被拦截。
+# 拦截提示都在页面开头，只读取正文前 16 KB 查找关键字
+MAX_BODY_BYTES = 16 * 1024
 
-    返回结果示例：
-    - {"status": "blocked", "keywords": [...], "http_status": 200}
-    - {"status": "ok", "redirect_to": "https://...", "http_status": 302}
-    - {"status": "unknown", "http_status": 200}
-    - {"status": "error", "error": "..."}
-    """
-    encoded_target = quote_plus(target_url)
-    check_url = DOUYIN_CHECK_URL_TEMPLATE.format(target=encoded_target)
 
+# NOTE: hot-path singletons —— 关键字字节串、线程 Session、DNS 缓存等都在模块级创建，
+# 每次检测直接复用，不要挪到检测函数内部按次构建。
+
+# 关键字预先编码为 UTF-8 字节串，直接在原始响应字节中查找，省去整页解码
+_DOUYIN_KW_BYTES = [kw.encode("utf-8") for kw in DOUYIN_BLOCK_KEYWORDS]
+_WEIBO_KW_BYTES = [kw.encode("utf-8") for kw in WEIBO_BLOCK_KEYWORDS]
+
+
+def _encoded_keywords(resp: requests.Response, keywords: List[str], keywords_utf8: List[bytes]) -> List[bytes]:
+    """返回与响应编码一致的关键字字节串：页面明确声明了非 UTF-8 编码（如 GBK）时按该编码重新编码。"""
+    if "charset" not in resp.headers.get("Content-Type", "").lower():
+        return keywords_utf8
+    charset = requests.utils.get_encoding_from_headers(resp.headers)
+    # Content-Type 里只是出现了 "charset" 字样、并没有 charset 参数时（如 application/x-charsetless）为 None
+    if not charset:
+        return keywords_utf8
     try:
-        # 不自动跟随重定向，方便判断是否正常跳转
-        resp = requests.get(check_url, timeout=timeout, allow_redirects=False)
-    except requests.RequestException as exc:  # 网络/超时等错误
-        return {"status": "error", "error": str(exc)}
+        if codecs.lookup(charset).name == "utf-8":
+            return keywords_utf8
+        return [kw.encode(charset) for kw in keywords]
+    except (LookupError, UnicodeEncodeError):
+        return keywords_utf8
+
+
+def _find_keywords(body: bytes, keywords: List[str], keyword_bytes: List[bytes]) -> List[str]:
+    """返回 body 中出现的关键字，顺序与 keywords 一致。"""
+    return [kw for kw, kwb in zip(keywords, keyword_bytes) if kwb in body]
+
+
+def _has_keyword(body: bytes, keyword_bytes: List[bytes]) -> bool:
+    """body 中是否出现任一关键字，命中第一个即返回。"""
+    return any(kwb in body for kwb in keyword_bytes)
+
+
+# 检测只会访问这两个固定的域名，解析结果缓存一段时间，省去每次新建连接时的 DNS 查询
+DNS_CACHE_TTL = 300  # 秒
+_CHECK_HOSTS = frozenset(
+    urlsplit(template).hostname
+    for template in (DOUYIN_CHECK_URL_TEMPLATE, WEIBO_CHECK_URL_TEMPLATE)
+)
+
+_system_getaddrinfo = socket.getaddrinfo
+_dns_cache: dict = {}
+_dns_lock = threading.Lock()
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    if host not in _CHECK_HOSTS:
+        return _system_getaddrinfo(host, port, family, type, proto, flags)
+
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return list(entry[1])
+
+    infos = _system_getaddrinfo(host, port, family, type, proto, flags)
+    # IPv4 地址排在前面：本机 IPv6 不通时，不必每次先等 IPv6 连接超时再回退
+    infos.sort(key=lambda info: info[0] != socket.AF_INET)
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, infos)
+    return list(infos)
+
+
+def install_dns_cache() -> None:
+    """为检测域名启用 DNS 缓存（替换 socket.getaddrinfo，其他域名不受影响）。"""
+    socket.getaddrinfo = _cached_getaddrinfo
 
-    status_code = resp.status_code
 
+# 每个线程持有自己的 Session：既能复用 keep-alive 连接，避免每个链接都重新握手，
+# 又不会让大量检测线程争抢同一个 urllib3 连接池的锁。
+_TLS = threading.local()
+
+
+def get_session() -> requests.Session:
+    """返回当前线程专用的 Session，首次调用时创建。"""
+    session = getattr(_TLS, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_maxsize=2, max_retries=0))
+        _TLS.session = session
+    return session
+
+
+def close_session() -> None:
+    """关闭并丢弃当前线程的 Session，检测线程退出前调用。"""
+    session = getattr(_TLS, "session", None)
+    if session is not None:
+        session.close()
+        _TLS.session = None
+
+
+# 检测结果缓存：同一批域名经常被反复检测，命中缓存时直接返回，省去一次网络请求。
+# 只缓存 "ok" / "blocked" 这类确定的结果，"unknown" / "error" 下次仍会重新检测。
+RESULT_CACHE_TTL = 3600  # 秒
+RESULT_CACHE_DIR = os.path.expanduser("~/.douyin_check")
+_MEMORY_CACHE_MAXSIZE = 8192
+
+_memory_cache: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_disk_cache = None
+_disk_cache_unavailable = diskcache is None
+
+
+def _get_disk_cache():
+    """首次使用时再打开磁盘缓存，未安装 diskcache 或目录不可用时返回 None。"""
+    global _disk_cache, _disk_cache_unavailable
+    if _disk_cache_unavailable:
+        return None
+    with _cache_lock:
+        if _disk_cache is None and not _disk_cache_unavailable:
+            try:
+                _disk_cache = diskcache.Cache(RESULT_CACHE_DIR)
+            except OSError:
+                _disk_cache_unavailable = True
+    return _disk_cache
+
+
+def _memory_cache_put(key: Tuple[str, str], result: dict, expire_at: float) -> None:
+    with _cache_lock:
+        _memory_cache[key] = (expire_at, result)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > _MEMORY_CACHE_MAXSIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[dict]:
+    now = time.time()
+    with _cache_lock:
+        entry = _memory_cache.get(key)
+        if entry is not None:
+            expire_at, result = entry
+            if expire_at > now:
+                _memory_cache.move_to_end(key)
+                return dict(result)
+            del _memory_cache[key]
+
+    disk = _get_disk_cache()
+    if disk is None:
+        return None
+    result, expire_at = disk.get(key, expire_time=True)
+    if result is None:
+        return None
+    _memory_cache_put(key, result, expire_at or now + RESULT_CACHE_TTL)
+    return dict(result)
+
+
+def _cache_set(key: Tuple[str, str], result: dict) -> None:
+    if result.get("status") not in ("ok", "blocked"):
+        return
+    _memory_cache_put(key, dict(result), time.time() + RESULT_CACHE_TTL)
+    disk = _get_disk_cache()
+    if disk is not None:
+        disk.set(key, result, expire=RESULT_CACHE_TTL)
+
+
+def _cached_check(key: Tuple[str, str], use_cache: bool, with_keywords: bool, check) -> dict:
+    """先查缓存，未命中再调用 check() 实际检测；use_cache=False 时跳过读取但仍刷新缓存。"""
+    if use_cache:
+        cached = _cache_get(key)
+        # 缓存里的拦截结果可能没有记录命中的关键字，需要关键字时当作未命中
+        if cached is not None and not (with_keywords and cached["status"] == "blocked" and "keywords" not in cached):
+            return cached
+    result = check()
+    _cache_set(key, result)
+    return result
+
+
+def warm_up() -> None:
+    """预热检测域名的 DNS：提前解析一次，让第一批检测直接命中 install_dns_cache() 的缓存。
+
+    只做 DNS 解析，不建立连接（检测线程各自的 Session 无法在这里预先建立）。
+    失败会被忽略，适合在后台线程中调用。
+    """
+    for template in (DOUYIN_CHECK_URL_TEMPLATE, WEIBO_CHECK_URL_TEMPLATE):
+        parts = urlsplit(template)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            # 参数与 urllib3 建立连接时一致，才能命中同一条缓存
+            socket.getaddrinfo(
+                parts.hostname,
+                port,
+                urllib3.util.connection.allowed_gai_family(),
+                socket.SOCK_STREAM,
+            )
+        except OSError:
+            pass
+
+
+def _read_body_prefix(resp: requests.Response) -> bytes:
+    """读取响应正文（原始字节，不解码）的前 MAX_BODY_BYTES 字节，其余部分不再下载。"""
+    return resp.raw.read(MAX_BODY_BYTES, decode_content=True) or b""
+
+
+def _redirect_result(resp: requests.Response) -> Optional[dict]:
     # 如果返回 3xx 并且包含 Location，一般表示正常跳转
-    if 300 <= status_code < 400 and "Location" in resp.headers:
+    if 300 <= resp.status_code < 400 and "Location" in resp.headers:
         return {
             "status": "ok",
             "redirect_to": resp.headers["Location"],
-            "http_status": status_code,
+            "http_status": resp.status_code,
         }
+    return None
 
-    text = resp.text or ""
-    hit_keywords = [kw for kw in DOUYIN_BLOCK_KEYWORDS if kw in text]
 
-    if hit_keywords:
-        return {
+def _check_jump(
+    check_url: str,
+    keywords: List[str],
+    keywords_utf8: List[bytes],
+    timeout: int,
+    with_keywords: bool,
+) -> dict:
+    """请求检测链接并根据跳转 / 页面关键字判断状态，抖音和微博共用。
+
+    判断状态只需知道是否命中任一关键字；with_keywords=True 时才额外统计具体命中了哪些。
+    """
+    session = get_session()
+
+    try:
+        # 先用 HEAD 探测：正常跳转是最常见的情况，这样完全不需要下载正文。
+        # 不自动跟随重定向，方便判断是否正常跳转
+        resp = session.head(check_url, timeout=timeout, allow_redirects=False)
+    except requests.RequestException as exc:  # 网络/超时等错误
+        return {"status": "error", "error": str(exc)}
+
+    result = _redirect_result(resp)
+    if result is not None:
+        return result
+
+    # 需要检查页面内容（或服务端不支持 HEAD）时再发 GET。
+    # Range 让支持的服务端只返回开头部分（206）；不支持时 stream=True 也只读取有限的前缀
+    try:
+        resp = session.get(
+            check_url,
+            timeout=timeout,
+            allow_redirects=False,
+            stream=True,
+            headers={"Range": f"bytes=0-{MAX_BODY_BYTES - 1}"},
+        )
+    except requests.RequestException as exc:
+        return {"status": "error", "error": str(exc)}
+
+    try:
+        status_code = resp.status_code
+
+        result = _redirect_result(resp)
+        if result is not None:
+            return result
+
+        # 206 / 416 只是 Range 请求带来的：对应的整页请求是 200，按 200 上报，
+        # 与不带 Range 时的结果保持一致；416 表示页面为空，无需读取正文
+        if status_code in (206, 416):
+            empty_page = status_code == 416
+            status_code = 200
+        else:
+            empty_page = False
+
+        keyword_bytes = _encoded_keywords(resp, keywords, keywords_utf8)
+        try:
+            body = b"" if empty_page else _read_body_prefix(resp)
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as exc:
+            return {"status": "error", "error": str(exc)}
+    finally:
+        resp.close()
+
+    if _has_keyword(body, keyword_bytes):
+        result = {
             "status": "blocked",
-            "keywords": hit_keywords,
             "http_status": status_code,
         }
+        if with_keywords:
+            result["keywords"] = _find_keywords(body, keywords, keyword_bytes)
+        return result
 
     # 没有命中关键字、也没有明显的 3xx 跳转，标记为未知状态
     return {
@@ -60,47 +321,59 @@ def check_douyin_jump(target_url: str, timeout: int = 10) -> dict:
     }
 
 
-def check_weibo_jump(target_url: str, timeout: int = 10) -> dict:
+def check_douyin_jump(
+    target_url: str,
+    timeout: int = 10,
+    use_cache: bool = True,
+    with_keywords: bool = True,
+) -> dict:
+    """使用抖音检测链接检查目标地址是否被拦截。
+
+    返回结果示例：
+    - {"status": "blocked", "keywords": [...], "http_status": 200}
+    - {"status": "ok", "redirect_to": "https://...", "http_status": 302}
+    - {"status": "unknown", "http_status": 200}
+    - {"status": "error", "error": "..."}
+
+    "http_status" 为检测页面本身的状态码：为限制读取量发出的 Range 请求所返回的
+    206 / 416 会按 200 上报。
+    只读取页面前 MAX_BODY_BYTES 字节查找关键字，"keywords" 只包含这部分中出现的关键字；
+    只关心状态时传入 with_keywords=False，结果中不带 "keywords"，可省去关键字统计。
+    结果会缓存 RESULT_CACHE_TTL 秒，传入 use_cache=False 可强制重新检测。
+    """
+    encoded_target = quote_plus(target_url)
+    check_url = DOUYIN_CHECK_URL_TEMPLATE.format(target=encoded_target)
+    return _cached_check(
+        ("douyin", target_url),
+        use_cache,
+        with_keywords,
+        lambda: _check_jump(check_url, DOUYIN_BLOCK_KEYWORDS, _DOUYIN_KW_BYTES, timeout, with_keywords),
+    )
+
+
+def check_weibo_jump(
+    target_url: str,
+    timeout: int = 10,
+    use_cache: bool = True,
+    with_keywords: bool = True,
+) -> dict:
     """使用微博 sinaurl 检测目标地址是否被拦截。
 
     规则：
     - 若返回 3xx 且带 Location，视为正常跳转（"ok"）。
     - 若页面文案中包含“将要访问”或“已停止访问”，视为拦截（"blocked"）。
     - 其余情况为 "unknown" 或 "error"。
+    - with_keywords 参数和结果缓存规则与 check_douyin_jump 相同。
     """
 
     encoded_target = quote_plus(target_url)
     check_url = WEIBO_CHECK_URL_TEMPLATE.format(target=encoded_target)
-
-    try:
-        resp = requests.get(check_url, timeout=timeout, allow_redirects=False)
-    except requests.RequestException as exc:
-        return {"status": "error", "error": str(exc)}
-
-    status_code = resp.status_code
-
-    if 300 <= status_code < 400 and "Location" in resp.headers:
-        return {
-            "status": "ok",
-            "redirect_to": resp.headers["Location"],
-            "http_status": status_code,
-        }
-
-    text = resp.text or ""
-    weibo_block_keywords = ["将要访问", "已停止访问"]
-    hit_keywords = [kw for kw in weibo_block_keywords if kw in text]
-
-    if hit_keywords:
-        return {
-            "status": "blocked",
-            "keywords": hit_keywords,
-            "http_status": status_code,
-        }
-
-    return {
-        "status": "unknown",
-        "http_status": status_code,
-    }
+    return _cached_check(
+        ("weibo", target_url),
+        use_cache,
+        with_keywords,
+        lambda: _check_jump(check_url, WEIBO_BLOCK_KEYWORDS, _WEIBO_KW_BYTES, timeout, with_keywords),
+    )
 
 
 def main() -> None:
@@ -115,10 +388,22 @@ def main() -> None:
         default=10,
         help="请求超时时间（秒），默认 10",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="忽略已缓存的检测结果，强制重新检测",
+    )
 
     args = parser.parse_args()
 
-    result = check_douyin_jump(args.url, timeout=args.timeout)
+    install_dns_cache()
+
+    result = check_douyin_jump(
+        args.url,
+        timeout=args.timeout,
+        use_cache=not args.no_cache,
+        with_keywords=False,
+    )
 
     status = result.get("status")
 
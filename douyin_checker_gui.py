@@ -3,11 +3,15 @@ import sys
 import time
 import threading
 import queue
+import itertools
 import os
 import re
-from typing import List
+import unicodedata
+from collections import Counter
+from typing import List, Optional, Tuple
 
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, QLibraryInfo
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, QLibraryInfo, QRunnable, QThreadPool
+from PyQt5.QtGui import QCloseEvent, QTextCursor
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -20,117 +24,205 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QSpinBox,
     QProgressBar,
+    QCheckBox,
 )
 
-from douyin_check import check_douyin_jump, check_weibo_jump
+from douyin_check import (
+    check_douyin_jump,
+    check_weibo_jump,
+    close_session,
+    install_dns_cache,
+    warm_up,
+)
+
+
+try:
+    # 可选依赖：安装 google-re2 后使用 RE2 引擎，匹配耗时与文本长度成线性关系，
+    # 导入超大文件时不会出现回溯；未安装时退回标准库 re
+    import re2
+except ImportError:
+    re2 = None
+
+# 大小写不敏感用内联 (?i)，RE2 与标准库 re 都支持；字符类因此只需写小写
+_DOMAIN_PATTERN = r"(?i)\b(?:(?:[a-z0-9][a-z0-9-]*\.)+[a-z]{2,})\b"
 
+# perf: keep at module scope —— 每次调用都重新编译会拖慢大批量提取
+if re2 is not None:
+    # RE2 的 \b 本身就只按 ASCII 判断
+    DOMAIN_REGEX = re2.compile(_DOMAIN_PATTERN)
+else:
+    # re.ASCII：只做 ASCII 字符判断，\b 也不会把紧挨着的中文当成单词字符
+    DOMAIN_REGEX = re.compile(_DOMAIN_PATTERN, re.ASCII)
 
-DOMAIN_REGEX = re.compile(r"\b(?:(?:[a-zA-Z0-9][a-zA-Z0-9-]*\.)+[a-zA-Z]{2,})\b")
+
+def _is_foreign_letter(ch: str) -> bool:
+    """ch 是否为非 ASCII、非中日韩的字母（如 ü、é）。
+
+    ASCII 模式的 \\b 把这类字母当作非单词字符，紧挨着它们的匹配只是某个单词的一截
+    （"bücher.example.com" 会匹配出 "cher.example.com"），需要丢弃；
+    中日韩文字（东亚宽字符）旁边的匹配则是正常写法，予以保留。
+    """
+    return (
+        not ch.isascii()
+        and ch.isalpha()
+        and unicodedata.east_asian_width(ch) not in ("W", "F")
+    )
 
 
 def extract_domains_from_text(text: str) -> List[str]:
     """从任意文本中提取域名列表（去重、小写）。"""
     seen = set()
     domains: List[str] = []
-    for match in DOMAIN_REGEX.findall(text):
-        domain = match.lower()
+    for match in DOMAIN_REGEX.finditer(text):
+        start, end = match.start(), match.end()
+        if (start > 0 and _is_foreign_letter(text[start - 1])) or (
+            end < len(text) and _is_foreign_letter(text[end])
+        ):
+            continue
+        domain = match.group(0).lower()
         if domain not in seen:
             seen.add(domain)
             domains.append(domain)
     return domains
 
 
+class _CheckWorker(QRunnable):
+    """一个检测线程的工作：在 run() 中循环领取链接，直到本轮链接全部处理完。
+
+    不按链接逐个提交 QRunnable：PyQt 每次进入 run() 都会为线程池线程新建 Python 线程状态，
+    threading.local 中的 Session（以及 diskcache 的 sqlite 连接）无法跨任务保留，
+    会退化成每个链接都重新建立连接。一个 run() 处理一串链接，整轮只用一个 Session。
+    """
+
+    def __init__(self, manager: "WorkerManager", urls: List[str], idx: "itertools.count[int]") -> None:
+        super().__init__()
+        self._manager = manager
+        self._urls = urls
+        self._idx = idx
+
+    def run(self) -> None:
+        try:
+            # 各线程 next(idx) 领取下标，itertools.count 在 CPython 中是原子的，无需加锁
+            while True:
+                i = next(self._idx)
+                if i >= len(self._urls):
+                    break
+                self._manager._check_one(self._urls[i])
+        finally:
+            close_session()
+
+
 class WorkerManager(QObject):
-    """管理检测线程和任务队列。"""
+    """管理检测任务。
+
+    每个检测线程作为一个长期运行的 QRunnable 提交到 QThreadPool，线程的创建和并发上限交给 Qt，
+    各线程从同一个下标计数器领取链接。
+    检测线程只把结果放进无锁的 SimpleQueue，由界面线程定时调用 flush() 取出、
+    统计并批量发出，避免高 QPS 时每个链接都要抢锁、触发一次信号，界面被大量小更新拖慢。
+    所有链接处理完后，finished 也由 flush() 发出。
+    """
 
-    logMessage = pyqtSignal(str)
-    resultReady = pyqtSignal(str, str)  # url, status
+    logBatch = pyqtSignal(list)  # List[str]
+    resultBatch = pyqtSignal(list)  # List[Tuple[url, status]]
     statsUpdate = pyqtSignal(int, int, int, int)  # total, checked, normal, blocked
     finished = pyqtSignal()
 
     def __init__(self) -> None:
         super().__init__()
-        self._queue: queue.Queue[str] = queue.Queue()
-        self._threads: List[threading.Thread] = []
+        # 用私有线程池而不是 globalInstance()：QCoreApplication 析构时会等待全局线程池清空，
+        # 私有池不会让其他代码（包括退出流程）被本轮检测拖住
+        self._pool = QThreadPool(self)
         self._stop = threading.Event()
         self._pause = threading.Event()
-        self._lock = threading.Lock()
 
         self.total = 0
-        self.checked = 0
-        self.normal = 0
-        self.blocked = 0
-        self._active_threads = 0
+        # 已处理完（含停止后跳过）的任务数，只在界面线程中读写
+        self._done = 0
+        self._running = False
+
+        # 检测任务产生的 (url, status, error)，status 为 None 表示停止后跳过；只由 flush() 取出
+        self._events: queue.SimpleQueue[Tuple[str, Optional[str], Optional[str]]] = queue.SimpleQueue()
+        # 各状态计数，只在界面线程（start / flush）中读写，无需加锁
+        self._counts: Counter[str] = Counter()
 
         # 当前检测平台："douyin" 或 "weibo"
         self.mode: str = "douyin"
+        # 为 False 时不读取缓存，所有链接重新检测
+        self.use_cache: bool = True
 
-    def start(self, urls: List[str], num_threads: int, mode: str = "douyin") -> None:
+    def start(
+        self,
+        urls: List[str],
+        num_threads: int,
+        mode: str = "douyin",
+        use_cache: bool = True,
+    ) -> None:
         """开始一轮新的检测。"""
-        # 重置状态
-        with self._lock:
-            self.total = len(urls)
-            self.checked = 0
-            self.normal = 0
-            self.blocked = 0
+        # 重置状态（上一轮的任务都已结束，直接换一个新的结果队列）
+        self.total = len(urls)
+        self._done = 0
+        self._counts = Counter()
+        self._events = queue.SimpleQueue()
+        self._running = True
 
         self.mode = mode
+        self.use_cache = use_cache
 
         self._stop.clear()
         self._pause.clear()
 
-        # 清空队列
-        while not self._queue.empty():
-            try:
-                self._queue.get_nowait()
-            except queue.Empty:
-                break
-
-        # 填充新的任务
-        for u in urls:
-            self._queue.put(u)
-
-        self._threads = []
-        self._active_threads = num_threads
-
-        for i in range(num_threads):
-            t = threading.Thread(target=self._thread_entry, name=f"Checker-{i+1}", daemon=True)
-            self._threads.append(t)
-            t.start()
+        # 链接在开始前就已确定，各线程共享同一份列表和下标计数器；
+        # 检测是纯网络 I/O，线程数超过链接数没有意义
+        urls = list(urls)
+        idx = itertools.count()
+        num_workers = min(num_threads, len(urls))
+        self._pool.setMaxThreadCount(max(num_workers, 1))
+        for _ in range(num_workers):
+            self._pool.start(_CheckWorker(self, urls, idx))
+
+    def _check_one(self, url: str) -> None:
+        """在线程池线程中检测一个链接，结果放入 _events。"""
+        # 暂停时简单等待
+        while self._pause.is_set() and not self._stop.is_set():
+            time.sleep(0.1)
+
+        if self._stop.is_set():
+            self._events.put((url, None, None))
+            return
 
-    def _thread_entry(self) -> None:
+        status = "error"
+        error = None
         try:
-            self._worker_loop()
-        finally:
-            with self._lock:
-                self._active_threads -= 1
-                if self._active_threads <= 0:
-                    self.finished.emit()
+            if self.mode == "douyin":
+                result = check_douyin_jump(url, use_cache=self.use_cache, with_keywords=False)
+            elif self.mode == "weibo":
+                result = check_weibo_jump(url, use_cache=self.use_cache, with_keywords=False)
+            else:
+                raise ValueError(f"未知检测模式: {self.mode}")
 
-    def _worker_loop(self) -> None:
-        while not self._stop.is_set():
-            # 暂停时简单等待
-            while self._pause.is_set() and not self._stop.is_set():
-                time.sleep(0.1)
+            status = result.get("status", "error")
+        except Exception as exc:  # 保底防止单个链接异常导致线程退出
+            error = str(exc)
+            status = "error"
+
+        self._events.put((url, status, error))
 
+    def flush(self) -> None:
+        """取出检测任务的结果，更新统计并一次性发给界面，需在界面线程中调用。"""
+        logs: List[str] = []
+        results: List[Tuple[str, str]] = []
+        while True:
             try:
-                url = self._queue.get_nowait()
+                url, status, error = self._events.get_nowait()
             except queue.Empty:
                 break
 
-            status = "error"
-            try:
-                if self.mode == "douyin":
-                    result = check_douyin_jump(url)
-                elif self.mode == "weibo":
-                    result = check_weibo_jump(url)
-                else:
-                    raise ValueError(f"未知检测模式: {self.mode}")
-
-                status = result.get("status", "error")
-            except Exception as exc:  # 保底防止单个链接异常导致线程退出
-                self.logMessage.emit(f"检测出错：{url} -> {exc}")
-                status = "error"
+            self._done += 1
+            if status is None:
+                continue
+
+            if error is not None:
+                logs.append(f"检测出错：{url} -> {error}")
 
             # 显示用中文状态
             if status == "ok":
@@ -142,22 +234,19 @@ class WorkerManager(QObject):
             else:
                 status_text = "错误"
 
-            with self._lock:
-                self.checked += 1
-                if status == "ok":
-                    self.normal += 1
-                elif status == "blocked":
-                    self.blocked += 1
+            self._counts[status] += 1
+            results.append((url, status))
+            logs.append(f"{url} -> {status_text}")
 
-                total = self.total
-                checked = self.checked
-                normal = self.normal
-                blocked = self.blocked
+        if results:
+            checked = sum(self._counts.values())
+            self.resultBatch.emit(results)
+            self.statsUpdate.emit(self.total, checked, self._counts["ok"], self._counts["blocked"])
+            self.logBatch.emit(logs)
 
-            # 发出信号更新 UI
-            self.resultReady.emit(url, status)
-            self.statsUpdate.emit(total, checked, normal, blocked)
-            self.logMessage.emit(f"{url} -> {status_text}")
+        if self._running and self._done >= self.total:
+            self._running = False
+            self.finished.emit()
 
     def pause(self) -> None:
         self._pause.set()
@@ -183,10 +272,15 @@ class MainWindow(QMainWindow):
         self._running = False
         self._start_time: float | None = None
         self._current_mode: str = "douyin"  # 当前检测平台
+        # 最近一次统计：(待检测, 已检测, 正常, 拦截)，供定时刷新 QPS / 耗时时复用
+        self._last_stats: Tuple[int, int, int, int] = (0, 0, 0, 0)
 
         self._build_ui()
         self._connect_signals()
 
+        # 后台预热检测域名的 DNS 解析（只填充 DNS 缓存，不建立连接），不阻塞界面显示
+        threading.Thread(target=warm_up, name="WarmUp", daemon=True).start()
+
     def _build_ui(self) -> None:
         # 不做重度自定义皮肤，更多依赖 macOS 自带样式，只稍微调整边距和占位提示
         central = QWidget(self)
@@ -213,10 +307,15 @@ class MainWindow(QMainWindow):
 
         lbl_threads = QLabel("线程数：")
 
+        self.chk_ignore_cache = QCheckBox("忽略缓存")
+        self.chk_ignore_cache.setToolTip("勾选后不使用之前缓存的检测结果，所有链接重新检测")
+
         top_layout.addWidget(self.btn_import)
         top_layout.addSpacing(10)
         top_layout.addWidget(lbl_threads)
         top_layout.addWidget(self.spin_threads)
+        top_layout.addSpacing(10)
+        top_layout.addWidget(self.chk_ignore_cache)
         top_layout.addSpacing(20)
         top_layout.addWidget(self.btn_start_douyin)
         top_layout.addWidget(self.btn_start_weibo)
@@ -248,6 +347,8 @@ class MainWindow(QMainWindow):
         lbl_middle = QLabel("检测日志：")
         self.edit_log = QPlainTextEdit()
         self.edit_log.setReadOnly(True)
+        # 日志只保留最近的行数，避免大批量检测时文档无限增长、重绘越来越慢
+        self.edit_log.setMaximumBlockCount(5000)
         self.edit_log.setPlaceholderText("检测过程中的详细日志会显示在这里……")
         middle_layout.addWidget(lbl_middle)
         middle_layout.addWidget(self.edit_log)
@@ -282,14 +383,19 @@ class MainWindow(QMainWindow):
         self.timer.setInterval(500)
         self.timer.timeout.connect(self._update_qps_and_time)
 
+        # 定时器用于批量刷新检测线程产生的日志和结果
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(100)
+        self.flush_timer.timeout.connect(self.manager.flush)
+
     def _connect_signals(self) -> None:
         self.btn_import.clicked.connect(self._import_file)
         self.btn_start_douyin.clicked.connect(self._start_check_douyin)
         self.btn_start_weibo.clicked.connect(self._start_check_weibo)
         self.btn_pause.clicked.connect(self._toggle_pause)
 
-        self.manager.logMessage.connect(self._append_log)
-        self.manager.resultReady.connect(self._handle_result)
+        self.manager.logBatch.connect(self._append_log_batch)
+        self.manager.resultBatch.connect(self._handle_result_batch)
         self.manager.statsUpdate.connect(self._update_stats_counts)
         self.manager.finished.connect(self._on_finished)
 
@@ -347,7 +453,12 @@ class MainWindow(QMainWindow):
         self.progress.setMaximum(total)
         self.progress.setValue(0)
 
-        self.manager.start(unique_urls, num_threads=num_threads, mode=mode)
+        self.manager.start(
+            unique_urls,
+            num_threads=num_threads,
+            mode=mode,
+            use_cache=not self.chk_ignore_cache.isChecked(),
+        )
 
         self.btn_start_douyin.setEnabled(False)
         self.btn_start_weibo.setEnabled(False)
@@ -356,7 +467,9 @@ class MainWindow(QMainWindow):
         self.btn_pause.setText("暂停")
 
         self.timer.start()
-        self._refresh_stats_label(total, 0, 0, 0, 0.0, 0.0)
+        self.flush_timer.start()
+        self._last_stats = (total, 0, 0, 0)
+        self._refresh_stats_label(*self._last_stats, 0.0, 0.0)
 
         mode_text = "抖音" if mode == "douyin" else "微博"
         self._append_log(f"开始{mode_text}检测，共 {total} 条链接，线程数：{num_threads}。")
@@ -375,17 +488,34 @@ class MainWindow(QMainWindow):
 
     # ---------- WorkerManager 回调 ----------
 
+    @staticmethod
+    def _append_text(edit: QPlainTextEdit, text: str) -> None:
+        """在文本框末尾一次性插入一段（可多行）文本，插入期间暂停重绘。"""
+        edit.setUpdatesEnabled(False)
+        try:
+            cursor = QTextCursor(edit.document())
+            cursor.movePosition(QTextCursor.End)
+            if not edit.document().isEmpty():
+                text = "\n" + text
+            cursor.insertText(text)
+        finally:
+            edit.setUpdatesEnabled(True)
+
     def _append_log(self, text: str) -> None:
-        self.edit_log.appendPlainText(text)
+        self._append_text(self.edit_log, text)
         # 自动滚动到底部
         cursor = self.edit_log.textCursor()
         cursor.movePosition(cursor.End)
         self.edit_log.setTextCursor(cursor)
 
-    def _handle_result(self, url: str, status: str) -> None:
+    def _append_log_batch(self, lines: List[str]) -> None:
+        self._append_log("\n".join(lines))
+
+    def _handle_result_batch(self, results: List[Tuple[str, str]]) -> None:
         # 只在右侧展示正常链接
-        if status == "ok":
-            self.edit_ok.appendPlainText(url)
+        ok_urls = [url for url, status in results if status == "ok"]
+        if ok_urls:
+            self._append_text(self.edit_ok, "\n".join(ok_urls))
 
     def _update_stats_counts(self, total: int, checked: int, normal: int, blocked: int) -> None:
         # 更新进度条
@@ -401,11 +531,13 @@ class MainWindow(QMainWindow):
                 qps = checked / elapsed
 
         pending = max(total - checked, 0)
+        self._last_stats = (pending, checked, normal, blocked)
         self._refresh_stats_label(pending, checked, normal, blocked, qps, elapsed)
 
     def _on_finished(self) -> None:
         self._running = False
         self.timer.stop()
+        self.flush_timer.stop()
 
         self.btn_start_douyin.setEnabled(True)
         self.btn_start_weibo.setEnabled(True)
@@ -415,6 +547,14 @@ class MainWindow(QMainWindow):
 
         self._append_log("检测完成。")
 
+    def closeEvent(self, event: QCloseEvent) -> None:
+        # 关闭窗口时停止检测：剩余链接直接标记为跳过，不再访问网络，
+        # 退出只需等待正在进行的请求结束（最多一个请求超时）
+        self.manager.stop()
+        self.timer.stop()
+        self.flush_timer.stop()
+        super().closeEvent(event)
+
     # ---------- 统计 / QPS / 耗时 ----------
 
     def _refresh_stats_label(
@@ -435,24 +575,11 @@ class MainWindow(QMainWindow):
         if not self._running or self._start_time is None:
             return
 
-        # 从统计标签中取数值需要解析文本，比较繁琐
-        # 这里简单做：只更新 QPS / 耗时部分，其余通过最近一次 statsUpdate 保持
-        # 为保持实现简单，我们不解析现有文本，而是在上次保存的计数基础上更新
-        # 因此在 _update_stats_counts 中已完整刷新一次，这里只在没有新结果时更新耗时/QPS
-        text = self.label_stats.text()
-        # 简单分割获取当前计数
-        try:
-            parts = text.split()
-            pending = int(parts[0].split("：")[1])
-            checked = int(parts[1].split("：")[1])
-            normal = int(parts[2].split("：")[1])
-            blocked = int(parts[3].split("：")[1])
-        except Exception:
-            return
-
+        # 计数沿用最近一次 statsUpdate 保存的值，这里只更新 QPS / 耗时
+        checked = self._last_stats[1]
         elapsed = max(time.monotonic() - self._start_time, 0.0)
         qps = (checked / elapsed) if elapsed > 0 else 0.0
-        self._refresh_stats_label(pending, checked, normal, blocked, qps, elapsed)
+        self._refresh_stats_label(*self._last_stats, qps, elapsed)
 
 
 def main() -> None:
@@ -461,6 +588,8 @@ def main() -> None:
     platforms_path = os.path.join(plugins_path, "platforms")
     os.environ.setdefault("QT_QPA_PLATFORM_PLUGIN_PATH", platforms_path)
 
+    install_dns_cache()
+
     app = QApplication(sys.argv)
     # 使用 macOS 风格（在支持的系统上会更贴近原生外观）
     app.setStyle("macintosh")